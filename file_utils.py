@@ -1,29 +1,41 @@
 import re
 import asyncio
-from typing import List
+from typing import AsyncIterator, Iterable, List
 from pathlib import Path
 
 chapter_patterns = [
         # r'No.[012345678910\d]+Volume',
-        r'Chapter [012345678910\d]',
-        r'No. [012345678910\d]',
-        r'Chapter\s+\d+',
-        r'CHAPTER\s+\d+',
+        # Matched case-insensitively, so this also covers "CHAPTER 1", "Chapter 1" and "Chapter1"
+        r'Chapter\s*\d+',
+        r'No\.\s*\d+',
         # r'Volume\d+',
-        r'Chapter\d+',
-        r'Chapter\d+',
 ]
 
+# All chapter patterns fused into one alternation so the content is scanned in a single pass.
+# Each alternative is a named group (p0, p1, ...) so match.lastgroup tells which pattern hit;
+# _chapter_matches uses that to keep splitting on the first pattern that matches anywhere.
+_CHAPTER_UNION = re.compile(
+    "|".join(f"(?P<p{i}>{p})" for i, p in enumerate(chapter_patterns)), re.IGNORECASE | re.MULTILINE
+)
+
+# iter_chapters reads this many characters at a time, and rescans this many characters
+# of the previous chunk so headers split across a chunk boundary are still found
+_STREAM_CHUNK_SIZE = 1 << 20
+_STREAM_OVERLAP = 64
+
 async def split_novel_by_chapters(file_path: str) -> List[str]:
     """Divide the novel into chapters"""
     
+    # Read the file once, off the event loop; the fallback below reuses this content
+    try:
+        content = await asyncio.to_thread(Path(file_path).read_text, encoding='utf-8')
+    except Exception as e:
+        print(f"Failed to read file: {e}")
+        return ["Unable to read file contents"]
+    
     try:
-        # Read the file
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-        
         # If the file contains the chapter CHAPTER
-        if _is_chapter_title(content):  # Files larger than 50KB
+        if _CHAPTER_UNION.search(content):  # Files larger than 50KB
             chapters = await _split_large_novel(content)
         else:
             chapters = await _split_small_novel(content)
@@ -37,11 +49,49 @@ async def split_novel_by_chapters(file_path: str) -> List[str]:
     except Exception as e:
         print(f"Failed to split chapter: {e}")
         # Return the entire document as a chapter
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                return [f.read()]
-        except:
-            return ["Unable to read file contents"]
+        return [content]
+
+async def iter_chapters(file_path: str, chunk_size: int = _STREAM_CHUNK_SIZE) -> AsyncIterator[str]:
+    """Stream the novel and yield chapters as each one closes, without reading the whole file into memory.
+
+    Text before the first chapter title is skipped, as in _split_large_novel. Nothing is yielded
+    if the file has no chapter titles; use split_novel_by_chapters for the paragraph fallback.
+    The whole file is never seen at once, so this splits on a match of any chapter pattern
+    rather than only the first pattern that appears in the file.
+    """
+    
+    with open(file_path, 'r', encoding='utf-8') as f:
+        buf = ""         # Text from the start of the current chapter (or the unmatched tail of the preamble)
+        started = False  # Whether buf begins with a chapter title
+        pos = 0          # Where the next scan of buf starts
+        
+        while True:
+            chunk = await asyncio.to_thread(f.read, chunk_size)
+            if not chunk:
+                break
+            buf += chunk
+            
+            cut = 0
+            for match in _CHAPTER_UNION.finditer(buf, pos):
+                if started:
+                    chapter_content = _strip_slice(buf, cut, match.start())
+                    if chapter_content:
+                        yield chapter_content
+                started = True
+                cut = match.start()
+            
+            if started:
+                buf = buf[cut:]
+                # Never rescan position 0, which is the title of the current chapter
+                pos = max(1, len(buf) - _STREAM_OVERLAP)
+            else:
+                buf = buf[-_STREAM_OVERLAP:]
+                pos = 0
+        
+        if started:
+            chapter_content = _strip_slice(buf, 0, len(buf))
+            if chapter_content:
+                yield chapter_content
 
 async def _split_large_novel(content: str) -> List[str]:
     """Dividing a large novel"""
@@ -58,19 +108,7 @@ async def _split_large_novel(content: str) -> List[str]:
     #    r'Chapter\d+',
     # ]
     
-    chapters = []
-    
-    for pattern in chapter_patterns:
-        matches = list(re.finditer(pattern, content, re.MULTILINE | re.IGNORECASE))
-        if len(matches) >= 2:  # At least 2 chapter markers found
-            chapters = _extract_chapters_by_pattern(content, matches)
-            if chapters:
-                break
-        if len(matches) == 1:  # At least 2 chapter markers found
-            chapters = _extract_chapters_by_pattern(content, matches)
-            if chapters:
-                break
-            
+    chapters = _extract_chapters_by_pattern(content, _chapter_matches(content))
     
     # If no chapter marker is found, split by paragraph
     if not chapters:
@@ -81,50 +119,56 @@ async def _split_large_novel(content: str) -> List[str]:
 async def _split_small_novel(content: str) -> List[str]:
     """Split short stories"""
     
-    # Try simple chapter splitting
-    lines = content.split('\n')
-    chapters = []
-    current_chapter = []
-    
-    for line in lines:
-        line = line.strip()
-        if not line:
-            continue
-            
-        # Check if it is a chapter title
-        if _is_chapter_title(line):
-            if current_chapter:
-                chapters.append('\n'.join(current_chapter))
-                current_chapter = []
-            current_chapter.append(line)
-        else:
-            current_chapter.append(line)
-    
-    # Add the last chapter
-    if current_chapter:
-        chapters.append('\n'.join(current_chapter))
+    # Find every chapter title in one regex pass instead of testing line by line
+    chapters = _extract_chapters_by_pattern(content, _chapter_matches(content))
     
-    print(chapters)
-    # If there is only one chapter, split it into paragraphs
-    if len(chapters) == 1:
+    # If there is at most one chapter, split it into paragraphs
+    if len(chapters) <= 1:
         chapters = await _split_by_paragraphs(content)
     
     return chapters
 
-def _extract_chapters_by_pattern(content: str, matches: List) -> List[str]:
+def _chapter_matches(content: str) -> List[re.Match]:
+    """Matches of the first chapter pattern (in chapter_patterns order) found anywhere in content"""
+    buckets = {}
+    for match in _CHAPTER_UNION.finditer(content):
+        buckets.setdefault(match.lastgroup, []).append(match)
+    
+    for i in range(len(chapter_patterns)):
+        matches = buckets.get(f"p{i}")
+        if matches:
+            return matches
+    return []
+
+def _extract_chapters_by_pattern(content: str, matches: Iterable[re.Match]) -> List[str]:
     """Extract chapters based on matching patterns"""
     chapters = []
     
-    for i, match in enumerate(matches):
+    # Each chapter runs from one match to the next, so only the previous start is kept
+    start = None
+    for match in matches:
+        if start is not None:
+            chapter_content = _strip_slice(content, start, match.start())
+            if chapter_content:
+                chapters.append(chapter_content)
         start = match.start()
-        end = matches[i + 1].start() if i + 1 < len(matches) else len(content)
-        
-        chapter_content = content[start:end].strip()
+    
+    # The last chapter runs to the end of the content
+    if start is not None:
+        chapter_content = _strip_slice(content, start, len(content))
         if chapter_content:
             chapters.append(chapter_content)
     
     return chapters
 
+def _strip_slice(content: str, start: int, end: int) -> str:
+    """Equivalent to content[start:end].strip(), but trims the offsets so only one copy is made"""
+    while start < end and content[start].isspace():
+        start += 1
+    while end > start and content[end - 1].isspace():
+        end -= 1
+    return content[start:end]
+
 async def _split_by_paragraphs(content: str) -> List[str]:
     """Split by paragraph"""
     
@@ -154,33 +198,6 @@ async def _split_by_paragraphs(content: str) -> List[str]:
     
     return chapters
 
-def _is_chapter_title(line: str) -> bool:
-    """Determine whether it is a chapter title"""
-    
-    # Length check
-    # if len(line) > 100:
-    #     return False
-    
-    # Chapter Title Mode
-    # patterns = [
-    #     r'No.[012345678910\d]+Volume',
-    #     r'Chapter [012345678910\d]',
-    #     r'No. [012345678910\d]',
-    #     r'Chapter\s+\d+',
-    #     r'CHAPTER\s+\d+',
-    #     r'Volume\d+',
-    #     r'Chapter\d+',
-    #     r'Chapter\d+',
-    #     r'^\d+\.', # Starts with a number
-    #     r'^\d+\s+', # Numbers begin with a space
-    # ]
-    
-    for pattern in chapter_patterns:
-        if re.search(pattern, line, re.IGNORECASE):
-            return True
-    
-    return False
-
 def extract_author(content: str) -> str:
     """Extract author information from novel content (matches 'author:' or 'author:' format)"""
     # Match pattern: author followed by a colon (full-width/half-width), then the author's name (not a line break character)
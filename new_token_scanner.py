@@ -15,6 +15,7 @@ import time
 import json
 import csv
 import sqlite3
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from typing import Optional, Any
 
@@ -30,6 +31,15 @@ except Exception:
     ContractLogicError = Exception
     get_event_data = None
 
+# eth_abi renamed decode_abi to decode in v4; accept either.
+try:
+    from eth_abi import decode as abi_decode
+except Exception:
+    try:
+        from eth_abi import decode_abi as abi_decode
+    except Exception:
+        abi_decode = None
+
 # Minimal ERC-20 ABI fragments
 ERC20_MIN_ABI = [
     {
@@ -72,6 +82,55 @@ ERC20_MIN_ABI = [
     },
 ]
 
+# (function name, 4-byte selector, return type) of the ERC-20 metadata getters probed per contract
+ERC20_METADATA_CALLS = [
+    ("name", "0x06fdde03", "string"),
+    ("symbol", "0x95d89b41", "string"),
+    ("decimals", "0x313ce567", "uint8"),
+    ("totalSupply", "0x18160ddd", "uint256"),
+]
+
+# Runtime code of an EIP-1167 minimal proxy starts with this; the ERC-20 selectors live in its implementation
+EIP1167_PREFIX = bytes.fromhex("363d3d373d3d3d363d73")
+# EIP-1967 implementation slot; transparent and UUPS proxies embed it and delegate every token call
+EIP1967_IMPLEMENTATION_SLOT = bytes.fromhex("360894a13ba1a3210667c828492db98dca3e2076cc3735a920a3ca505d382bbc")
+# name, symbol and decimals are optional in ERC-20, so only totalSupply is required of the bytecode
+TOTAL_SUPPLY_SELECTOR = bytes.fromhex("18160ddd")
+
+# Multicall3 is deployed at the same address on ETH and BSC. aggregate3 lets the four
+# metadata getters go out as a single eth_call instead of four round trips.
+MULTICALL3_ADDRESS = "0xcA11bde05977b3631167028862bE2a173976CA11"
+MULTICALL3_ABI = [
+    {
+        "inputs": [
+            {
+                "components": [
+                    {"internalType": "address", "name": "target", "type": "address"},
+                    {"internalType": "bool", "name": "allowFailure", "type": "bool"},
+                    {"internalType": "bytes", "name": "callData", "type": "bytes"},
+                ],
+                "internalType": "struct Multicall3.Call3[]",
+                "name": "calls",
+                "type": "tuple[]",
+            }
+        ],
+        "name": "aggregate3",
+        "outputs": [
+            {
+                "components": [
+                    {"internalType": "bool", "name": "success", "type": "bool"},
+                    {"internalType": "bytes", "name": "returnData", "type": "bytes"},
+                ],
+                "internalType": "struct Multicall3.Result[]",
+                "name": "returnData",
+                "type": "tuple[]",
+            }
+        ],
+        "stateMutability": "payable",
+        "type": "function",
+    },
+]
+
 # Compute Transfer event topic. Prefer Web3.keccak; fall back to eth_utils.keccak if available.
 # As a last resort use the known constant for the Transfer event topic.
 try:
@@ -96,6 +155,19 @@ except Exception:
     pass
 
 DEFAULT_POLL = 4  # seconds between polls (not the confirmation wait)
+DEFAULT_WORKERS = 8  # contracts inspected concurrently per block
+MAX_LOG_WINDOW = 1024  # most blocks a single Transfer get_logs query may span
+# Substrings providers use when rejecting a get_logs query as too wide. Kept specific so
+# rate-limit errors ("rate limit exceeded", "too many requests") are raised, not retried smaller
+LOG_RANGE_ERRORS = (
+    "block range",
+    "range too large",
+    "range is too large",
+    "query returned more than",
+    "response size exceeded",
+    "too many logs",
+    "too many results",
+)
 
 
 def init_db(db_path: str):
@@ -121,13 +193,16 @@ def init_db(db_path: str):
         """
     )
     conn.commit()
+    # WAL with synchronous=NORMAL avoids an fsync per commit; commits are batched per block in main_loop
+    c.execute("PRAGMA journal_mode=WAL")
+    c.execute("PRAGMA synchronous=NORMAL")
+    c.execute("PRAGMA temp_store=MEMORY")
     return conn
 
 
-def safe_contract_call(w3: Any, address: str, fn_name: str, abi_fragment: dict, block_identifier: Optional[int] = None, timeout_seconds: int = 10):
-    """Attempt a low-risk eth_call for the given function name. Returns (success, value_or_error)"""
+def safe_contract_call(contract: Any, fn_name: str, block_identifier: Optional[int] = None, timeout_seconds: int = 10):
+    """Attempt a low-risk eth_call for the given function name on a prebuilt contract. Returns (success, value_or_error)"""
     try:
-        contract = w3.eth.contract(address=Web3.to_checksum_address(address), abi=[abi_fragment])
         func = getattr(contract.functions, fn_name)()
         val = func.call(block_identifier=block_identifier)
         return True, val
@@ -137,31 +212,86 @@ def safe_contract_call(w3: Any, address: str, fn_name: str, abi_fragment: dict,
         return False, str(e)
 
 
-def export_csv_json(conn: sqlite3.Connection, csv_path: str, json_path: str):
+def multicall_erc20_metadata(multicall: Any, address: str, block_identifier: Optional[int] = None):
+    """Fetch all ERC-20 metadata getters in one Multicall3 eth_call. Returns {fn_name: (success, value_or_error)}"""
+    calls = [(address, True, bytes.fromhex(selector[2:])) for _, selector, _ in ERC20_METADATA_CALLS]
+    results = multicall.functions.aggregate3(calls).call(block_identifier=block_identifier)
+
+    out = {}
+    for (fn_name, _, out_type), (success, return_data) in zip(ERC20_METADATA_CALLS, results):
+        if not success or not return_data:
+            out[fn_name] = (False, "call failed or returned no data")
+            continue
+        try:
+            out[fn_name] = (True, abi_decode([out_type], return_data)[0])
+        except Exception as e:
+            out[fn_name] = (False, str(e))
+    return out
+
+
+EXPORT_COLUMNS = "chain,address,creation_block,found_block,tx_hash,timestamp_utc,name,symbol,decimals,total_supply,has_transfer_logs,extra_json"
+
+
+def jsonl_path_for(json_path: str) -> str:
+    """Path of the JSONL sibling that per-block exports append to"""
+    return os.path.splitext(json_path)[0] + ".jsonl"
+
+
+def export_csv_json(conn: sqlite3.Connection, csv_path: str, json_path: str) -> int:
+    """Rewrite the CSV, JSON and JSONL exports from the whole table. Returns the last exported row id."""
     c = conn.cursor()
-    c.execute("SELECT chain,address,creation_block,found_block,tx_hash,timestamp_utc,name,symbol,decimals,total_supply,has_transfer_logs,extra_json FROM tokens ORDER BY id")
+    c.execute(f"SELECT id,{EXPORT_COLUMNS} FROM tokens ORDER BY id")
     rows = c.fetchall()
-    headers = [x[0] for x in c.description]
+    headers = [x[0] for x in c.description][1:]
 
     with open(csv_path, "w", newline='', encoding='utf-8') as f:
         writer = csv.writer(f)
         writer.writerow(headers)
         for r in rows:
-            writer.writerow(r)
+            writer.writerow(r[1:])
 
     out = []
     for r in rows:
-        out.append(dict(zip(headers, r)))
+        out.append(dict(zip(headers, r[1:])))
     with open(json_path, "w", encoding='utf-8') as f:
         json.dump(out, f, ensure_ascii=False, indent=2)
+    with open(jsonl_path_for(json_path), "w", encoding='utf-8') as f:
+        for entry in out:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
 
     print(f"Exported {len(rows)} discoveries to {csv_path} and {json_path}")
+    return rows[-1][0] if rows else 0
 
 
-def already_seen(conn: sqlite3.Connection, address: str) -> bool:
+def append_new_rows(conn: sqlite3.Connection, csv_path: str, json_path: str, last_id: int) -> int:
+    """Append rows with id > last_id to the CSV and the JSONL sibling of json_path. Returns the new last exported id."""
     c = conn.cursor()
-    c.execute("SELECT 1 FROM tokens WHERE address = ?", (address.lower(),))
-    return c.fetchone() is not None
+    c.execute(f"SELECT id,{EXPORT_COLUMNS} FROM tokens WHERE id > ? ORDER BY id", (last_id,))
+    rows = c.fetchall()
+    if not rows:
+        return last_id
+    headers = [x[0] for x in c.description][1:]
+
+    write_header = not os.path.exists(csv_path) or os.path.getsize(csv_path) == 0
+    with open(csv_path, "a", newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        if write_header:
+            writer.writerow(headers)
+        for r in rows:
+            writer.writerow(r[1:])
+
+    jsonl_path = jsonl_path_for(json_path)
+    with open(jsonl_path, "a", encoding='utf-8') as f:
+        for r in rows:
+            f.write(json.dumps(dict(zip(headers, r[1:])), ensure_ascii=False) + "\n")
+
+    print(f"Appended {len(rows)} discoveries to {csv_path} and {jsonl_path}")
+    return rows[-1][0]
+
+
+def load_seen_addresses(conn: sqlite3.Connection) -> set:
+    """Lowercased addresses already in the DB, so duplicate checks are a set lookup instead of a query"""
+    return {row[0] for row in conn.execute("SELECT address FROM tokens")}
 
 
 def save_token(conn: sqlite3.Connection, data: dict):
@@ -183,10 +313,75 @@ def save_token(conn: sqlite3.Connection, data: dict):
             json.dumps(data.get("extra_json", {})),
         ),
     )
-    conn.commit()
 
 
-def inspect_contract(w3: Any, address: str, creation_block: int, found_block: int):
+def get_transfer_logs(w3: Any, address: str, from_block: int, to_block: int):
+    """get_logs for Transfer events, halving the window (keeping the newest blocks) while the provider rejects it as too wide"""
+    while True:
+        try:
+            return w3.eth.get_logs({"fromBlock": from_block, "toBlock": to_block, "address": address, "topics": [TRANSFER_EVENT_SIG, None, None]})
+        except Exception as e:
+            if to_block <= from_block or not any(m in str(e).lower() for m in LOG_RANGE_ERRORS):
+                raise
+            from_block = to_block - (to_block - from_block) // 2
+
+
+def fetch_receipts(w3: Any, tx_hashes: list):
+    """Fetch receipts for tx_hashes, in one batched RPC round trip when web3 supports it (v7+).
+    Returns a list aligned with tx_hashes; entries are None where the receipt could not be fetched."""
+    if not tx_hashes:
+        return []
+
+    if hasattr(w3, "batch_requests"):
+        try:
+            with w3.batch_requests() as batch:
+                for tx_hash in tx_hashes:
+                    batch.add(w3.eth.get_transaction_receipt(tx_hash))
+                return list(batch.execute())
+        except Exception as e:
+            print(f"  Batched receipt fetch failed, falling back to one request per tx: {e}")
+
+    receipts = []
+    for tx_hash in tx_hashes:
+        try:
+            receipts.append(w3.eth.get_transaction_receipt(tx_hash))
+        except Exception as e:
+            print(f"  Could not get receipt for tx {tx_hash.hex()}: {e}")
+            receipts.append(None)
+    return receipts
+
+
+def contract_address_getter(receipt: Any):
+    """Return a function reading the created contract address from receipts shaped like this one.
+
+    web3 versions differ in attribute naming: some expose receipt.contract_address,
+    others use contractAddress in the dict-like receipt.
+    """
+    if hasattr(receipt, "contract_address"):
+        # Attribute access (web3 v5 style)
+        return lambda r: getattr(r, "contract_address", None)
+    if hasattr(receipt, "get"):
+        # dict-like access (web3 v6 style)
+        return lambda r: r.get("contractAddress")
+    return lambda r: getattr(r, "contractAddress", None)
+
+
+def has_erc20_selectors(w3: Any, address: str, block_identifier: Optional[int] = None) -> bool:
+    """Cheap pre-check with one eth_getCode: does the bytecode contain the totalSupply selector?
+
+    Minimal (EIP-1167) and EIP-1967 proxies are let through since their code only delegates, and so
+    is anything whose code can't be fetched; the full inspection decides for those.
+    """
+    try:
+        code = bytes(w3.eth.get_code(address, block_identifier=block_identifier))
+    except Exception:
+        return True
+    if code.startswith(EIP1167_PREFIX) or EIP1967_IMPLEMENTATION_SLOT in code:
+        return True
+    return TOTAL_SUPPLY_SELECTOR in code
+
+
+def inspect_contract(w3: Any, address: str, creation_block: int, found_block: int, multicall: Any = None, skip_non_erc20: bool = False):
     info = {
         "name": None,
         "symbol": None,
@@ -196,28 +391,59 @@ def inspect_contract(w3: Any, address: str, creation_block: int, found_block: in
         "extra_json": {},
     }
 
-    ok, val = safe_contract_call(w3, address, "name", ERC20_MIN_ABI[0], block_identifier=found_block)
+    # Checksum the address once; every call below reuses it
+    try:
+        checksum = Web3.to_checksum_address(address)
+    except Exception as e:
+        info["extra_json"]["contract_error"] = str(e)
+        return info
+
+    # Skip the metadata calls and log scan for contracts that can't be ERC-20 tokens
+    if skip_non_erc20 and not has_erc20_selectors(w3, checksum, block_identifier=found_block):
+        info["extra_json"]["skipped"] = "bytecode lacks ERC-20 selectors"
+        return info
+
+    # One batched eth_call through Multicall3 when available, else one call per getter
+    results = None
+    if multicall is not None and abi_decode is not None:
+        try:
+            results = multicall_erc20_metadata(multicall, checksum, block_identifier=found_block)
+        except Exception as e:
+            info["extra_json"]["multicall_error"] = str(e)
+    if results is None:
+        # Only the fallback needs a Contract; build it once with the full ABI and share it across the getters
+        try:
+            contract = w3.eth.contract(address=checksum, abi=ERC20_MIN_ABI)
+        except Exception as e:
+            info["extra_json"]["contract_error"] = str(e)
+            contract = None
+        results = {
+            fn_name: safe_contract_call(contract, fn_name, block_identifier=found_block) if contract is not None else (False, "no contract")
+            for fn_name, _, _ in ERC20_METADATA_CALLS
+        }
+
+    ok, val = results["name"]
     if ok:
         try:
             info["name"] = val
         except Exception:
             info["extra_json"]["name_call_raw"] = str(val)
 
-    ok, val = safe_contract_call(w3, address, "symbol", ERC20_MIN_ABI[1], block_identifier=found_block)
+    ok, val = results["symbol"]
     if ok:
         try:
             info["symbol"] = val
         except Exception:
             info["extra_json"]["symbol_call_raw"] = str(val)
 
-    ok, val = safe_contract_call(w3, address, "decimals", ERC20_MIN_ABI[2], block_identifier=found_block)
+    ok, val = results["decimals"]
     if ok:
         try:
             info["decimals"] = int(val)
         except Exception:
             info["extra_json"]["decimals_call_raw"] = str(val)
 
-    ok, val = safe_contract_call(w3, address, "totalSupply", ERC20_MIN_ABI[3], block_identifier=found_block)
+    ok, val = results["totalSupply"]
     if ok:
         try:
             info["total_supply"] = str(val)
@@ -225,9 +451,10 @@ def inspect_contract(w3: Any, address: str, creation_block: int, found_block: in
             info["extra_json"]["total_supply_call_raw"] = str(val)
 
     try:
-        from_block = creation_block
+        # Cap the window so a wide creation..found range can't turn into an O(chain height) scan
+        from_block = max(creation_block, found_block - MAX_LOG_WINDOW)
         to_block = found_block
-        logs = w3.eth.get_logs({"fromBlock": from_block, "toBlock": to_block, "address": Web3.to_checksum_address(address), "topics": [TRANSFER_EVENT_SIG]})
+        logs = get_transfer_logs(w3, checksum, from_block, to_block)
         info["has_transfer_logs"] = len(logs) > 0
         info["extra_json"]["transfer_log_count"] = len(logs)
     except Exception as e:
@@ -240,78 +467,97 @@ def main_loop(w3: Any, conn: sqlite3.Connection, args):
     last_processed_block = args.start_block if args.start_block is not None else None
     print("Starting main loop. Waiting for new blocks...")
     start_time = time.time()
+    seen = load_seen_addresses(conn)
+    dirty = False  # rows saved since the last export
 
-    while True:
-        try:
-            latest = w3.eth.block_number
-        except Exception as e:
-            print("Error fetching latest block:", e)
-            time.sleep(max(5, args.poll_interval))
-            continue
+    # Start from a full export so later ticks only need to append new rows
+    last_exported_id = export_csv_json(conn, args.csv_output, args.json_output)
 
-        if last_processed_block is None:
-            last_processed_block = latest - 1
+    # Inspections are RPC-latency bound, so the candidates of a block are inspected concurrently
+    executor = ThreadPoolExecutor(max_workers=max(1, getattr(args, "workers", DEFAULT_WORKERS)))
 
-        if latest <= last_processed_block:
-            time.sleep(args.poll_interval)
-            continue
+    try:
+        # Resolved from the first receipt seen; the receipt shape doesn't change within a run
+        get_contract_address = None
 
-        target_block = latest - args.confirmations + 1
-        if target_block <= last_processed_block:
-            time.sleep(args.poll_interval)
-            continue
+        # Built once and shared by every inspect_contract call
+        try:
+            multicall = w3.eth.contract(address=MULTICALL3_ADDRESS, abi=MULTICALL3_ABI)
+        except Exception as e:
+            print("Multicall3 unavailable, falling back to one eth_call per getter:", e)
+            multicall = None
 
-        for blk in range(last_processed_block + 1, target_block + 1):
+        while True:
             try:
-                block = w3.eth.get_block(blk, full_transactions=True)
+                latest = w3.eth.block_number
             except Exception as e:
-                print(f"Failed to fetch block {blk}: {e}")
+                print("Error fetching latest block:", e)
+                time.sleep(max(5, args.poll_interval))
+                continue
+
+            if last_processed_block is None:
+                last_processed_block = latest - 1
+
+            if latest <= last_processed_block:
+                time.sleep(args.poll_interval)
                 continue
 
-            print(f"Scanning block {blk} ({len(block.transactions)} txs)")
+            target_block = latest - args.confirmations + 1
+            if target_block <= last_processed_block:
+                time.sleep(args.poll_interval)
+                continue
 
-            for tx in block.transactions:
+            for blk in range(last_processed_block + 1, target_block + 1):
                 try:
-                    to_addr = tx.to
-                except Exception:
-                    to_addr = None
-
-                if to_addr is None:
-                    try:
-                        receipt = w3.eth.get_transaction_receipt(tx.hash)
-                    except Exception as e:
-                        print(f"  Could not get receipt for tx {tx.hash.hex()}: {e}")
+                    block = w3.eth.get_block(blk, full_transactions=True)
+                except Exception as e:
+                    print(f"Failed to fetch block {blk}: {e}")
+                    continue
+
+                print(f"Scanning block {blk} ({len(block.transactions)} txs)")
+
+                # Only contract creations (no `to`) need a receipt; fetch those in one batch
+                creation_txs = [
+                    tx for tx in block.transactions
+                    if (tx.get("to") if hasattr(tx, "get") else getattr(tx, "to", None)) is None
+                ]
+
+                receipts = fetch_receipts(w3, [tx.hash for tx in creation_txs])
+
+                # Same for every creation in the block, so format it once
+                block_ts_iso = datetime.fromtimestamp(block.timestamp, tz=timezone.utc).isoformat()
+
+                candidates = []
+                for tx, receipt in zip(creation_txs, receipts):
+                    if receipt is None:
                         continue
 
-                    # web3 versions differ in attribute naming: some expose receipt.contract_address,
-                    # others use contractAddress in the dict-like receipt. Support both.
-                    contract_address = None
-                    try:
-                        # Attribute access (web3 v5 style)
-                        contract_address = getattr(receipt, "contract_address", None)
-                    except Exception:
-                        contract_address = None
-                    if not contract_address:
-                        # dict-like access (web3 v6 style)
-                        try:
-                            if hasattr(receipt, "get"):
-                                contract_address = receipt.get("contractAddress")
-                        except Exception:
-                            contract_address = None
+                    if get_contract_address is None:
+                        get_contract_address = contract_address_getter(receipt)
+                    contract_address = get_contract_address(receipt)
                     if not contract_address:
                         continue
 
                     checksum_addr = Web3.to_checksum_address(contract_address)
                     print(f"  Detected contract creation: {checksum_addr} in tx {tx.hash.hex()} block {blk}")
 
-                    if already_seen(conn, checksum_addr):
+                    if checksum_addr.lower() in seen:
                         print("    Already recorded. Skipping.")
                         continue
 
-                    found_block = latest
-                    timestamp_utc = datetime.fromtimestamp(block.timestamp, tz=timezone.utc).isoformat()
+                    candidates.append((tx, checksum_addr))
+
+                # Overlap the RPC round trips of all candidates; results come back in candidate order
+                infos = executor.map(
+                    lambda candidate: inspect_contract(
+                        w3, candidate[1], creation_block=blk, found_block=blk, multicall=multicall,
+                        # --save-all keeps every candidate, so their metadata is still worth probing
+                        skip_non_erc20=not getattr(args, "save_all", False),
+                    ),
+                    candidates,
+                )
 
-                    info = inspect_contract(w3, checksum_addr, creation_block=blk, found_block=blk)
+                for (tx, checksum_addr), info in zip(candidates, infos):
                     if getattr(args, "verbose", False):
                         print(f"    Inspection info for {checksum_addr}: {json.dumps(info, ensure_ascii=False)}")
 
@@ -338,7 +584,7 @@ def main_loop(w3: Any, conn: sqlite3.Connection, args):
                         "creation_block": blk,
                         "found_block": target_block,
                         "tx_hash": tx.hash.hex(),
-                        "timestamp_utc": timestamp_utc,
+                        "timestamp_utc": block_ts_iso,
                         "name": info.get("name"),
                         "symbol": info.get("symbol"),
                         "decimals": info.get("decimals"),
@@ -357,6 +603,8 @@ def main_loop(w3: Any, conn: sqlite3.Connection, args):
                     # Save if plausible OR if user requested saving all candidates
                     if plausible or getattr(args, "save_all", False):
                         save_token(conn, data)
+                        seen.add(checksum_addr.lower())
+                        dirty = True
                         if plausible:
                             print(f"    Saved token {checksum_addr} (name={data['name']} symbol={data['symbol']} decimals={data['decimals']})")
                         else:
@@ -370,20 +618,31 @@ def main_loop(w3: Any, conn: sqlite3.Connection, args):
                                 cnt = cur.fetchone()[0]
                                 if cnt >= args.stop_at_count:
                                     print(f"Reached stop-at-count ({cnt} >= {args.stop_at_count}). Exiting main loop.")
+                                    conn.commit()
                                     export_csv_json(conn, args.csv_output, args.json_output)
                                     return
                         except Exception as e:
                             print(f"    Error checking stop_at_count: {e}")
 
-            last_processed_block = blk
+                # One commit per block instead of one per saved token
+                conn.commit()
+                last_processed_block = blk
 
-        export_csv_json(conn, args.csv_output, args.json_output)
+            # Append only the rows saved since the last export
+            if dirty:
+                last_exported_id = append_new_rows(conn, args.csv_output, args.json_output, last_exported_id)
+                dirty = False
 
-        if getattr(args, "run_duration", 0) and (time.time() - start_time) >= args.run_duration:
-            print(f"Reached run duration ({args.run_duration}s). Exported DB and exiting.")
-            return
+            if getattr(args, "run_duration", 0) and (time.time() - start_time) >= args.run_duration:
+                # The pretty JSON is only rewritten on exit
+                export_csv_json(conn, args.csv_output, args.json_output)
+                print(f"Reached run duration ({args.run_duration}s). Exported DB and exiting.")
+                return
 
-        time.sleep(args.poll_interval)
+            time.sleep(args.poll_interval)
+    finally:
+        # Drop queued inspections and let in-flight RPCs finish in the background
+        executor.shutdown(wait=False, cancel_futures=True)
 
 
 def parse_args():
@@ -400,6 +659,7 @@ def parse_args():
     p.add_argument("--verbose", action="store_true", help="Enable verbose logging for inspected contracts")
     p.add_argument("--debug-log", type=str, default=None, help="Path to append JSONL debug log of all inspected contract candidates")
     p.add_argument("--save-all", action="store_true", help="Save every detected contract candidate to the DB, even if not plausible ERC-20")
+    p.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="number of contract candidates inspected concurrently per block")
     p.add_argument("--stop-at-count", type=int, default=0, help="Stop scanning and exit when the DB contains at least this many tokens (0 = disabled)")
     return p.parse_args()
 
@@ -422,5 +682,6 @@ if __name__ == "__main__":
         main_loop(w3, conn, args)
     except KeyboardInterrupt:
         print("Interrupted. Exporting DB to CSV/JSON before exit...")
+        conn.commit()
         export_csv_json(conn, args.csv_output, args.json_output)
         print("Bye")
@@ -1,46 +1,283 @@
 import asyncio
 import json
-import uuid
+import logging
 import os
-from typing import Dict, List, Any
+import time
+import uuid
+from typing import TYPE_CHECKING, AsyncIterator, Dict, List, Any, Optional
 from pathlib import Path
-import base64
+import functools
+import hashlib
+import string
+from concurrent.futures import ThreadPoolExecutor
 import aiofiles
-import aiohttp
 from tools.generate_audio import generate_audio  # New Import
 from tools.generate_image import generate_image  # New Import
-import asyncio  # Make sure it has been imported
+
+# aiohttp is only needed once the shared session is first used; see _get_session
+if TYPE_CHECKING:
+    import aiohttp
+
+logger = logging.getLogger(__name__)
+
+# numpy is optional: without it the animation semantic cache is simply disabled
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# orjson is optional: it only speeds up (de)serializing the asset index and Ollama's stream
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _json_dumps(obj: Any) -> bytes:
+    """Serialize obj to UTF-8 JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+
+_json_loads = orjson.loads if orjson is not None else json.loads
+
+OLLAMA_DEFAULT_URL = "http://localhost:11434"
+EMBED_MODEL = "nomic-embed-text"
+ANIM_SIMILARITY_THRESHOLD = 0.92  # cosine similarity above which a cached animation is reused
+EMBED_RETRY_SECONDS = 600  # after a failed embedding call, skip the semantic cache for this long
+IMAGE_WORKERS = 2  # image generations allowed to run at once
+AUDIO_WORKERS = 2  # speech syntheses allowed to run at once
+MIN_ANIMATION_CHARS = 50  # shorter model output is treated as a failed generation
+BATCH_CONCURRENCY = 8  # generator calls in flight at once across generate_assets_batch calls
+PLACEHOLDER_IMAGE_URL = "https://via.placeholder.com/800x600/4A90E2/FFFFFF?text=Scene+Image"
+
+# Placeholder images by prompt keyword, checked in order
+_PH_RULES = (
+    (("forest", "nature"), "https://images.pexels.com/photos/147411/italy-mountains-dawn-daybreak-147411.jpeg?auto=compress&cs=tinysrgb&w=800"),
+    (("city", "urban"), "https://images.pexels.com/photos/374870/pexels-photo-374870.jpeg?auto=compress&cs=tinysrgb&w=800"),
+    (("ocean", "sea"), "https://images.pexels.com/photos/1704488/pexels-photo-1704488.jpeg?auto=compress&cs=tinysrgb&w=800"),
+    (("mountain",), "https://images.pexels.com/photos/1366919/pexels-photo-1366919.jpeg?auto=compress&cs=tinysrgb&w=800"),
+)
+_PH_DEFAULT = "https://images.pexels.com/photos/531880/pexels-photo-531880.jpeg?auto=compress&cs=tinysrgb&w=800"
+
+# Default animation CSS; only the scene id varies, so the template is built once
+_DEFAULT_ANIM_TMPL = string.Template("""
+        @keyframes sceneAnimation_${id} {
+            0% {
+                opacity: 0;
+                transform: translateY(30px) scale(0.95);
+            }
+            50% {
+                opacity: 0.7;
+                transform: translateY(-5px) scale(1.02);
+            }
+            100% {
+                opacity: 1;
+                transform: translateY(0) scale(1);
+            }
+        }
+        
+        @keyframes backgroundPulse_${id} {
+            0%, 100% {
+                background-size: 100% 100%;
+            }
+            50% {
+                background-size: 110% 110%;
+            }
+        }
+        
+        .scene-animation {
+            animation: sceneAnimation_${id} 3s ease-out forwards,
+                      backgroundPulse_${id} 6s ease-in-out infinite;
+        }
+        
+        .scene-animation::before {
+            content: '';
+            position: absolute;
+            top: 0;
+            left: 0;
+            right: 0;
+            bottom: 0;
+            background: linear-gradient(45deg, rgba(255,255,255,0.1), rgba(255,255,255,0));
+            animation: shimmer_${id} 4s ease-in-out infinite;
+        }
+        
+        @keyframes shimmer_${id} {
+            0% {
+                transform: translateX(-100%);
+            }
+            100% {
+                transform: translateX(100%);
+            }
+        }
+        """)
+
+@functools.lru_cache(maxsize=256)
+def _default_animation_css(scene_id: str) -> str:
+    """Default animation CSS for a scene, memoized since the same scene ids recur on retries"""
+    return _DEFAULT_ANIM_TMPL.substitute(id=scene_id)
+
+def _with_scene_id(scene_design: Dict[str, Any]) -> Dict[str, Any]:
+    """scene_design with a usable scene_id, generating one if it is missing or empty
+    
+    Entry points stamp the id once so the returned scene_id and the id in the CSS always agree.
+    """
+    if scene_design.get("scene_id"):
+        return scene_design
+    return {**scene_design, "scene_id": f"scene_{uuid.uuid4().hex[:8]}"}
+
+def _scene_id(scene_design: Dict[str, Any]) -> str:
+    """Scene id of scene_design, or "default" if it is missing or empty"""
+    return scene_design.get("scene_id") or "default"
+
+def _task_result(task: "asyncio.Task", fallback: Any) -> Any:
+    """Result of a finished task, or fallback if it failed or was cancelled"""
+    if task.cancelled() or task.exception() is not None:
+        return fallback
+    return task.result()
 
 class ProductionAgent:
     """Create an Agent - responsible for generating scene images, voice, and animation"""
     
+    # The asset layout is fixed, so only the first instance in a process needs to create it
+    _dirs_initialized: bool = False
+    
+    # Monotonic time before which _embed doesn't call Ollama, e.g. because the embedding model isn't pulled
+    _embed_retry_at: float = 0.0
+    
+    # Image generation gets one small pool per process, sized to what the model can run at once,
+    # so concurrent scenes (and agents) queue on it instead of piling onto the model
+    _image_exec = ThreadPoolExecutor(max_workers=IMAGE_WORKERS, thread_name_prefix="img")
+    # Speech synthesis is blocking too; run it off the event loop so gather actually overlaps it
+    _audio_exec = ThreadPoolExecutor(max_workers=AUDIO_WORKERS, thread_name_prefix="audio")
+    # Caps generator calls across all concurrent generate_assets_batch calls on a loop; see _batch_semaphore
+    _batch_sem: Optional[asyncio.Semaphore] = None
+    _batch_sem_loop: Optional[asyncio.AbstractEventLoop] = None
+    
     def __init__(self, ollama_client):
         self.ollama_client = ollama_client
         self.model_name = "gemma3n:e4b"
         # self.model_name = "qwen3:4b"
         self.assets_dir = Path("assets")
-        self.assets_dir.mkdir(exist_ok=True)
         
-        # Create a subdirectory
-        (self.assets_dir / "images").mkdir(exist_ok=True)
-        (self.assets_dir / "audios").mkdir(exist_ok=True)
-        (self.assets_dir / "animations").mkdir(exist_ok=True)
+        # Create the asset directory and its subdirectories
+        if not ProductionAgent._dirs_initialized:
+            for sub in ("images", "audios", "animations"):
+                (self.assets_dir / sub).mkdir(parents=True, exist_ok=True)
+            ProductionAgent._dirs_initialized = True
+        
+        # Content-addressed cache of generated images/audio: sha256 of the input -> generator result
+        self._cache_index_path = self.assets_dir / ".cache_index.json"
+        self._asset_cache: Dict[str, Any] = self._load_asset_cache()
+        self._cache_lock = asyncio.Lock()
+        
+        # Semantic cache for generated CSS: unit-norm prompt embeddings (one row each) and the matching CSS
+        self._anim_cache_path = self.assets_dir / ".anim_cache.npz"
+        self._anim_embeds, self._anim_css = self._load_anim_cache()
+        
+        # Shared HTTP session, created on first use so its connection pool is reused across requests
+        self._session: "Optional[aiohttp.ClientSession]" = None
+    
+    async def _get_session(self) -> "aiohttp.ClientSession":
+        """Return the shared HTTP session, creating it on first use"""
+        if self._session is None or self._session.closed:
+            import aiohttp
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=0, limit_per_host=32, ttl_dns_cache=300, keepalive_timeout=75)
+            )
+        return self._session
+    
+    async def aclose(self) -> None:
+        """Close the shared HTTP session"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
     
     async def generate_assets(self, scene_design: Dict[str, Any]) -> Dict[str, Any]:
         """Generate all assets for the scene"""
         
-        scene_id = scene_design.get("scene_id", f"scene_{uuid.uuid4().hex[:8]}")
+        scene_design = _with_scene_id(scene_design)
+        scene_id = scene_design["scene_id"]
+        
+        # Generate various materials in parallel; a failure cancels the others instead of waiting on them
+        try:
+            async with asyncio.TaskGroup() as tg:
+                image_task = tg.create_task(self._generate_scene_image(scene_design))
+                audio_task = tg.create_task(self._generate_scene_audio(scene_design))
+                animation_task = tg.create_task(self._generate_animation_code(scene_design))
+        except* Exception:
+            logger.exception("Asset generation failed")
+        
+        # Only the failed or cancelled assets fall back to placeholders; finished ones are kept
+        image_url = _task_result(image_task, PLACEHOLDER_IMAGE_URL)
+        audio_info = _task_result(audio_task, {"url": "", "duration": 0})
+        animation_code = _task_result(animation_task, None) or self._create_default_animation(scene_id)
+        
+        return self._build_assets(scene_id, scene_design, image_url, audio_info, animation_code)
+    
+    async def generate_assets_batch(self, scenes: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Generate assets for several scenes, running each distinct image prompt, narration and animation only once"""
+        
+        scenes = [_with_scene_id(scene) for scene in scenes]
+        scene_ids = [scene["scene_id"] for scene in scenes]
+        
+        sem = self._batch_semaphore()
         
-        # Generate various materials in parallel
-        image_task = sel生成各种素材f._generate_scene_image(scene_design)
-        audio_task = self._generate_scene_audio(scene_design)
-        animation_task = self._generate_animation_code(scene_design)
+        async def limited(make_coro):
+            # The coroutine is only created once a slot is held, so cancelled waiters leave nothing un-awaited
+            async with sem:
+                return await make_coro()
         
-        # Wait for all tasks to complete
-        image_url, audio_info, animation_code = await asyncio.gather(
-            image_task, audio_task, animation_task
-        )
+        # Scenes with the same key share one task, and so one generator call
+        image_keys = [scene.get("image_prompt", "a beautiful girl standing in the forest") for scene in scenes]
+        audio_keys = [scene.get("visual_description") or "" for scene in scenes]
+        animation_keys = [(scene.get("css_animation") or "", self._animation_key_text(scene)) for scene in scenes]
+        image_tasks, audio_tasks, animation_tasks = {}, {}, {}
+        animation_owners = {}  # animation key -> id of the scene whose task generates it
+        try:
+            async with asyncio.TaskGroup() as tg:
+                for scene_id, scene, image_key, audio_key, animation_key in zip(scene_ids, scenes, image_keys, audio_keys, animation_keys):
+                    if image_key not in image_tasks:
+                        image_tasks[image_key] = tg.create_task(limited(functools.partial(self._generate_scene_image, scene)))
+                    if audio_key not in audio_tasks:
+                        audio_tasks[audio_key] = tg.create_task(limited(functools.partial(self._generate_scene_audio, scene)))
+                    if animation_key not in animation_tasks:
+                        animation_tasks[animation_key] = tg.create_task(limited(functools.partial(self._generate_animation_code, scene)))
+                        animation_owners[animation_key] = _scene_id(scene)
+        except* Exception:
+            logger.exception("Batch asset generation failed")
+        
+        results = []
+        for scene_id, scene, image_key, audio_key, animation_key in zip(scene_ids, scenes, image_keys, audio_keys, animation_keys):
+            # The default animation is named after its scene, so a shared fallback is rebuilt for each scene
+            animation_code = _task_result(animation_tasks[animation_key], None)
+            if not animation_code or animation_code == self._create_default_animation(animation_owners[animation_key]):
+                animation_code = self._create_default_animation(_scene_id(scene))
+            results.append(self._build_assets(
+                scene_id,
+                scene,
+                _task_result(image_tasks[image_key], PLACEHOLDER_IMAGE_URL),
+                _task_result(audio_tasks[audio_key], {"url": "", "duration": 0}),
+                animation_code,
+            ))
+        return results
+    
+    @classmethod
+    def _batch_semaphore(cls) -> asyncio.Semaphore:
+        """The batch concurrency cap for the running loop
         
+        asyncio primitives bind to the loop that first waits on them, so a new one is made
+        whenever batches start running on a different loop (e.g. a second asyncio.run).
+        """
+        loop = asyncio.get_running_loop()
+        if cls._batch_sem is None or cls._batch_sem_loop is not loop:
+            cls._batch_sem = asyncio.Semaphore(BATCH_CONCURRENCY)
+            cls._batch_sem_loop = loop
+        return cls._batch_sem
+    
+    def _build_assets(self, scene_id: str, scene_design: Dict[str, Any], image_url: str, audio_info: Dict[str, Any], animation_code: str) -> Dict[str, Any]:
+        """Assemble the asset response for one scene"""
         return {
             "scene_id": scene_id,
             "image_url": image_url,
@@ -57,7 +294,7 @@ class ProductionAgent:
             # Image generation APIs (such as DALL-E, Stable Diffusion, etc.) should be called here
             # For demonstration purposes, we use placeholder images.
             
-            scene_id = scene_design.get("scene_id", "default")
+            scene_id = _scene_id(scene_design)
             visual_description = scene_design.get("visual_description", "A beautiful scene with mountains and river")
             image_prompt = scene_design.get("image_prompt", "a beautiful girl standing in the forest")
             output_dir = self.assets_dir / "images"  # Use the created audio directory
@@ -68,79 +305,321 @@ class ProductionAgent:
             # placeholder_url = await self._get_placeholder_image(scene_id, image_prompt)
             
             # return placeholder_url
-            print(f"visual_description: {visual_description}")
-            print(f"image_prompt: {image_prompt}")
-
-            image_url = await asyncio.to_thread(
-                generate_image,
-                prompt=image_prompt,
-                scene_id=scene_id,
-                output_dir=output_dir
+            logger.debug("visual_description: %s", visual_description)
+            logger.debug("image_prompt: %s", image_prompt)
+
+            # Same prompt was rendered before: reuse the file instead of generating again
+            key = self._asset_key("image", image_prompt)
+            cached = self._cached_asset(key)
+            if cached:
+                return cached
+
+            # Files are named by content hash so a cached entry is never overwritten by another scene
+            image_url = await asyncio.get_running_loop().run_in_executor(
+                self._image_exec,
+                functools.partial(
+                    generate_image,
+                    prompt=image_prompt,
+                    scene_id=key,
+                    output_dir=output_dir
+                )
             )
+            if image_url:
+                await self._remember_asset(key, image_url)
             
             # If the build fails, it returns the default placeholder.
-            return image_url or "https://via.placeholder.com/800x600/4A90E2/FFFFFF?text=Scene+Image"
+            return image_url or PLACEHOLDER_IMAGE_URL
             
             
-        except Exception as e:
-            print(f"Image generation failed: {e}")
-            return "https://via.placeholder.com/800x600/4A90E2/FFFFFF?text=Scene+Image"
+        except Exception:
+            logger.exception("Image generation failed")
+            return PLACEHOLDER_IMAGE_URL
     
     async def _get_placeholder_image(self, scene_id: str, prompt: str) -> str:
         """Get the placeholder image"""
-        # Choose appropriate placeholders based on scene content
-        if "forest" in prompt.lower() or "nature" in prompt.lower():
-            return "https://images.pexels.com/photos/147411/italy-mountains-dawn-daybreak-147411.jpeg?auto=compress&cs=tinysrgb&w=800"
-        elif "city" in prompt.lower() or "urban" in prompt.lower():
-            return "https://images.pexels.com/photos/374870/pexels-photo-374870.jpeg?auto=compress&cs=tinysrgb&w=800"
-        elif "ocean" in prompt.lower() or "sea" in prompt.lower():
-            return "https://images.pexels.com/photos/1704488/pexels-photo-1704488.jpeg?auto=compress&cs=tinysrgb&w=800"
-        elif "mountain" in prompt.lower():
-            return "https://images.pexels.com/photos/1366919/pexels-photo-1366919.jpeg?auto=compress&cs=tinysrgb&w=800"
-        else:
-            return "https://images.pexels.com/photos/531880/pexels-photo-531880.jpeg?auto=compress&cs=tinysrgb&w=800"
+        # Choose appropriate placeholders based on scene content; first matching rule wins
+        p = prompt.lower()
+        return next((url for keywords, url in _PH_RULES if any(k in p for k in keywords)), _PH_DEFAULT)
     
     async def _generate_scene_audio(self, scene_design: Dict[str, Any]) -> str:
         """Generate scene speech (return a dictionary containing URL and duration)"""
+        # dialogue_text = scene_design.get("dialogue_text", "")
+        dialogue_text = scene_design.get("visual_description") or ""
+        if not dialogue_text:
+            return {"url": "", "duration": 0}
+        
         try:
-            # dialogue_text = scene_design.get("dialogue_text", "")
-            dialogue_text = scene_design.get("visual_description", "")
-            
-            if not dialogue_text:
-                return {"url": "", "duration": 0}
-            
-            scene_id = scene_design.get("scene_id", "default")
             audio_output_dir = self.assets_dir / "audios"
 
+            # Same text was synthesized before: reuse the file instead of generating again
+            key = self._asset_key("audio", dialogue_text)
+            cached = self._cached_asset(key)
+            if cached:
+                return cached
+
             # Call the tool to generate speech (return a dictionary containing url and duration)
-            audio_info = generate_audio(
-                text=dialogue_text,
-                scene_id=scene_id,
-                output_dir=audio_output_dir
+            audio_info = await asyncio.get_running_loop().run_in_executor(
+                self._audio_exec,
+                functools.partial(
+                    generate_audio,
+                    text=dialogue_text,
+                    scene_id=key,
+                    output_dir=audio_output_dir
+                )
             )
+            if audio_info:
+                await self._remember_asset(key, audio_info)
 
             return audio_info if audio_info else {"url": "", "duration": 0}
-        except Exception as e:
-            print(f"Speech generation failed: {e}")
+        except Exception:
+            logger.exception("Speech generation failed")
             return {"url": "", "duration": 0}
     
+    def _load_asset_cache(self) -> Dict[str, Any]:
+        """Load the persisted asset cache index"""
+        try:
+            with open(self._cache_index_path, "rb") as f:
+                return _json_loads(f.read())
+        except (OSError, ValueError):
+            return {}
+    
+    def _asset_key(self, kind: str, text: str) -> str:
+        """Content-addressed cache key for a generated asset"""
+        return hashlib.sha256(f"{kind}|{text}|{self.model_name}".encode("utf-8")).hexdigest()
+    
+    def _cached_asset(self, key: str) -> Any:
+        """Cached generator result for key, or None if absent or its local file has since been removed"""
+        value = self._asset_cache.get(key)
+        if not value:
+            return None
+        url = value.get("url", "") if isinstance(value, dict) else str(value)
+        if url and "://" not in url and not (Path(url).exists() or Path(url.lstrip("/")).exists()):
+            self._asset_cache.pop(key, None)
+            return None
+        return value
+    
+    async def _remember_asset(self, key: str, value: Any) -> None:
+        """Record a generated asset and persist the cache index
+        
+        Failing to persist is logged and otherwise ignored; the asset itself was generated fine.
+        """
+        try:
+            _json_dumps(value)
+        except (TypeError, ValueError) as e:
+            logger.warning("Not caching unserializable asset %r: %s", value, e)
+            return
+        
+        async with self._cache_lock:
+            # Other instances and workers write the same index: merge their entries instead of overwriting them
+            index = await asyncio.to_thread(self._load_asset_cache)
+            index.update(self._asset_cache)
+            index[key] = value
+            self._asset_cache = index
+            
+            # Write a temp file and rename it over the index so readers never see a partial write
+            tmp_path = self._cache_index_path.with_name(f"{self._cache_index_path.name}.{uuid.uuid4().hex}.tmp")
+            try:
+                async with aiofiles.open(tmp_path, "wb") as f:
+                    await f.write(_json_dumps(index))
+                os.replace(tmp_path, self._cache_index_path)
+            except Exception as e:
+                logger.warning("Failed to persist asset cache index: %s", e)
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+    
+    def _load_anim_cache(self):
+        """Load the persisted animation semantic cache"""
+        if np is None:
+            return None, []
+        try:
+            with np.load(self._anim_cache_path) as data:
+                return data["embeds"], data["css"].tolist()
+        except Exception:
+            # Missing, truncated or otherwise unreadable (np.load can raise BadZipFile/EOFError): start empty
+            return None, []
+    
+    def _save_anim_cache(self, embeds, css) -> None:
+        """Atomically replace the persisted animation semantic cache"""
+        tmp_path = self._anim_cache_path.with_name(f"{self._anim_cache_path.name}.{uuid.uuid4().hex}.tmp")
+        try:
+            with open(tmp_path, "wb") as f:
+                np.savez_compressed(f, embeds=embeds, css=np.array(css))
+            os.replace(tmp_path, self._anim_cache_path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+    
+    async def _embed(self, text: str):
+        """Unit-norm embedding of text from Ollama, or None if unavailable"""
+        if np is None or time.monotonic() < ProductionAgent._embed_retry_at:
+            return None
+        try:
+            base_url = getattr(self.ollama_client, "base_url", OLLAMA_DEFAULT_URL)
+            session = await self._get_session()
+            async with session.post(
+                f"{base_url}/api/embeddings",
+                json={"model": EMBED_MODEL, "prompt": text},
+            ) as resp:
+                resp.raise_for_status()
+                embedding = (await resp.json()).get("embedding")
+            if not embedding:
+                return None
+            vec = np.asarray(embedding, dtype=np.float32)
+            norm = np.linalg.norm(vec)
+            return vec / norm if norm else None
+        except Exception as e:
+            # Don't pay a failing round trip per scene; try again after a while
+            ProductionAgent._embed_retry_at = time.monotonic() + EMBED_RETRY_SECONDS
+            logger.warning("Embedding failed, animation semantic cache off for %ds: %s", EMBED_RETRY_SECONDS, e)
+            return None
+    
+    def _lookup_animation(self, query) -> str:
+        """Cached CSS whose prompt embedding is closest to query, if similar enough"""
+        if self._anim_embeds is None or self._anim_embeds.shape[1] != query.shape[0]:
+            return ""
+        # Rows and query are unit-norm, so the dot product is the cosine similarity
+        sims = self._anim_embeds @ query
+        best = int(sims.argmax())
+        return self._anim_css[best] if sims[best] > ANIM_SIMILARITY_THRESHOLD else ""
+    
+    async def _remember_animation(self, query, animation_code: str) -> None:
+        """Add generated CSS to the semantic cache and persist it
+        
+        Failing to persist is logged and otherwise ignored, as for the asset index.
+        """
+        async with self._cache_lock:
+            # Other instances and workers write the same file: merge their entries instead of overwriting them.
+            # Rows are keyed by embedding; rows of another size (embedding model changed) are dropped.
+            disk_embeds, disk_css = await asyncio.to_thread(self._load_anim_cache)
+            rows = {}
+            for embeds, css in ((disk_embeds, disk_css), (self._anim_embeds, self._anim_css)):
+                if embeds is not None and embeds.shape[1] == query.shape[0]:
+                    rows.update((vec.tobytes(), (vec, text)) for vec, text in zip(embeds, css))
+            rows[query.tobytes()] = (query, animation_code)
+            
+            self._anim_embeds = np.vstack([vec for vec, _ in rows.values()])
+            self._anim_css = [text for _, text in rows.values()]
+            try:
+                await asyncio.to_thread(self._save_anim_cache, self._anim_embeds, self._anim_css)
+            except Exception as e:
+                logger.warning("Failed to persist animation cache: %s", e)
+    
+    def _animation_key_text(self, scene_design: Dict[str, Any]) -> str:
+        """Text identifying what an animation should look like; used for cache and batch keys"""
+        return f"{scene_design.get('animation_effects') or ''}|{scene_design.get('mood', 'neutral')}|{tuple(scene_design.get('color_palette', []))}"
+    
     async def _generate_animation_code(self, scene_design: Dict[str, Any]) -> str:
         """Generate animation code"""
+        # Scene design already carries its animation
+        css_animation = scene_design.get("css_animation")
+        if css_animation:
+            return css_animation
+        
         try:
             # Get animation information in scene design
-            css_animation = scene_design.get("css_animation", "")
-            animation_effects = scene_design.get("animation_effects", "")
-            scene_id = scene_design.get("scene_id", "default")
+            scene_id = _scene_id(scene_design)
             
-            if css_animation:
-                return css_animation
+            # Near-duplicate effects/mood/palette were animated before: reuse that CSS
+            query = await self._embed(self._animation_key_text(scene_design))
+            if query is not None:
+                cached = self._lookup_animation(query)
+                if cached:
+                    return cached
             
             # Generate animation code using AI
-            prompt = f"""
+            prompt = self._animation_prompt(scene_design)
+            
+            response = await self.ollama_client.generate(
+                model=self.model_name,
+                prompt=prompt,
+                stream=False
+            )
+            
+            animation_code = response.get("response", "").strip()
+            
+            #If AI spawn fails, use default animation
+            if len(animation_code) < MIN_ANIMATION_CHARS:
+                animation_code = self._create_default_animation(scene_id)
+            elif query is not None:
+                await self._remember_animation(query, animation_code)
+            
+            return animation_code
+            
+        except Exception:
+            logger.exception("Animation generation failed")
+            return self._create_default_animation(_scene_id(scene_design))
+    
+    async def stream_animation_code(self, scene_design: Dict[str, Any]) -> AsyncIterator[str]:
+        """Yield animation CSS as the model produces it, for forwarding to a streaming response
+        
+        Cached and pre-supplied CSS is yielded in one piece; anything that fails before
+        the first chunk goes out falls back to the default animation.
+        """
+        scene_id = _scene_id(scene_design)
+        css_animation = scene_design.get("css_animation")
+        if css_animation:
+            yield css_animation
+            return
+        
+        query = await self._embed(self._animation_key_text(scene_design))
+        if query is not None:
+            cached = self._lookup_animation(query)
+            if cached:
+                yield cached
+                return
+        
+        # Hold output back until it is long enough to be real CSS, so a failed
+        # generation can still be replaced by the default animation
+        parts: List[str] = []
+        sent = False
+        try:
+            base_url = getattr(self.ollama_client, "base_url", OLLAMA_DEFAULT_URL)
+            session = await self._get_session()
+            async with session.post(
+                f"{base_url}/api/generate",
+                json={"model": self.model_name, "prompt": self._animation_prompt(scene_design), "stream": True},
+            ) as resp:
+                resp.raise_for_status()
+                # Ollama streams one JSON object per line
+                async for line in resp.content:
+                    if not line.strip():
+                        continue
+                    chunk = _json_loads(line)
+                    text = chunk.get("response", "")
+                    if text:
+                        parts.append(text)
+                        if sent:
+                            yield text
+                        else:
+                            # Measured stripped, like the non-streaming path, so whitespace doesn't count
+                            held = "".join(parts).strip()
+                            if len(held) >= MIN_ANIMATION_CHARS:
+                                sent = True
+                                yield "".join(parts).lstrip()
+                    if chunk.get("done"):
+                        break
+        except Exception:
+            logger.exception("Animation streaming failed")
+            if sent:
+                return
+        
+        if not sent:
+            yield self._create_default_animation(scene_id)
+        elif query is not None:
+            await self._remember_animation(query, "".join(parts).strip())
+    
+    def _animation_prompt(self, scene_design: Dict[str, Any]) -> str:
+        """Prompt asking the model for a scene's CSS animation"""
+        return f"""
 As a front-end development expert, please create CSS animation code for the following scenarios：
 
-ScenarioID: {scene_id}
-animation effects: {animation_effects}
+ScenarioID: {_scene_id(scene_design)}
+animation effects: {scene_design.get('animation_effects') or ''}
 mood: {scene_design.get('mood', 'neutral')}
 color: {scene_design.get('color_palette', [])}
 
@@ -158,74 +637,7 @@ Requirements:
 
 Please return only the CSS code; do not include any other text.
 """
-            
-            response = await self.ollama_client.generate(
-                model=self.model_name,
-                prompt=prompt,
-                stream=False
-            )
-            
-            animation_code = response.get("response", "").strip()
-            
-            #If AI spawn fails, use default animation
-            if not animation_code or len(animation_code) < 50:
-                animation_code = self._create_default_animation(scene_id)
-            
-            return animation_code
-            
-        except Exception as e:
-            print(f"Animation generation failed: {e}")
-            return self._create_default_animation(scene_design.get("scene_id", "default"))
     
     def _create_default_animation(self, scene_id: str) -> str:
         """Creating a Default Animation"""
-        return f"""
-        @keyframes sceneAnimation_{scene_id} {{
-            0% {{
-                opacity: 0;
-                transform: translateY(30px) scale(0.95);
-            }}
-            50% {{
-                opacity: 0.7;
-                transform: translateY(-5px) scale(1.02);
-            }}
-            100% {{
-                opacity: 1;
-                transform: translateY(0) scale(1);
-            }}
-        }}
-        
-        @keyframes backgroundPulse_{scene_id} {{
-            0%, 100% {{
-                background-size: 100% 100%;
-            }}
-            50% {{
-                background-size: 110% 110%;
-            }}
-        }}
-        
-        .scene-animation {{
-            animation: sceneAnimation_{scene_id} 3s ease-out forwards,
-                      backgroundPulse_{scene_id} 6s ease-in-out infinite;
-        }}
-        
-        .scene-animation::before {{
-            content: '';
-            position: absolute;
-            top: 0;
-            left: 0;
-            right: 0;
-            bottom: 0;
-            background: linear-gradient(45deg, rgba(255,255,255,0.1), rgba(255,255,255,0));
-            animation: shimmer_{scene_id} 4s ease-in-out infinite;
-        }}
-        
-        @keyframes shimmer_{scene_id} {{
-            0% {{
-                transform: translateX(-100%);
-            }}
-            100% {{
-                transform: translateX(100%);
-            }}
-        }}
-        """
\ No newline at end of file
+        return _default_animation_css(scene_id)
\ No newline at end of file
@@ -1,6 +1,8 @@
 #!/usr/bin/env python3
 
 import asyncio
+import contextlib
+import os
 import uvicorn
 import sys
 from pathlib import Path
@@ -8,47 +10,126 @@ from pathlib import Path
 #Add the current directory to the Python path
 sys.path.insert(0, str(Path(__file__).parent))
 
-async def check_ollama_connection():
-    """Check Ollama Connection"""
+def install_eager_tasks(loop: asyncio.AbstractEventLoop):
+    """Have loop run new tasks eagerly (Python 3.12+)
+
+    With eager tasks, asyncio.gather over coroutines that finish without awaiting
+    (e.g. asset cache hits) completes without a round-trip through the event loop.
+    """
+    if hasattr(asyncio, "eager_task_factory"):
+        loop.set_task_factory(asyncio.eager_task_factory)
+
+def new_event_loop():
+    """Event loop for the launcher and the in-process server: uvloop when installed, with eager tasks"""
+    try:
+        import uvloop
+        loop = uvloop.new_event_loop()
+    except ImportError:
+        loop = asyncio.new_event_loop()
+    install_eager_tasks(loop)
+    return loop
+
+def create_app():
+    """ASGI app for uvicorn's worker and reload processes (loaded with factory=True)
+
+    Those processes never run main() and build their own loops, so eager tasks are
+    installed on the worker's running loop at lifespan startup.
+    """
+    from main import app
+    
+    async def eager_app(scope, receive, send):
+        if scope["type"] == "lifespan":
+            install_eager_tasks(asyncio.get_running_loop())
+        await app(scope, receive, send)
+    
+    return eager_app
+
+def worker_count(is_dev: bool) -> int:
+    """Server processes to run: one in development, otherwise NAM_WORKERS or one per core"""
+    if is_dev:
+        return 1
+    raw = os.environ.get("NAM_WORKERS", "").strip()
+    if not raw:
+        return os.cpu_count() or 2
+    try:
+        workers = int(raw)
+    except ValueError:
+        workers = 0
+    if workers < 1:
+        raise SystemExit(f"NAM_WORKERS must be a positive integer, got {raw!r}")
+    return workers
+
+async def check_ollama_connection(stack: contextlib.AsyncExitStack):
+    """Check Ollama Connection
+
+    Returns the connected client, left open on stack so the server can keep using
+    its session, or None if Ollama is unreachable.
+    """
     from utils.ollama_client import OllamaClient
     
     print("Check Ollama Connection...")
     try:
-        async with OllamaClient() as client:
-            models = await client.list_models()
-            print(f"✓ Ollama connection successful, available models: {len(models.get('models', []))} ")
+        client = await stack.enter_async_context(OllamaClient())
+        models = await client.list_models()
+        print(f"✓ Ollama connection successful, available models: {len(models.get('models', []))} ")
+        
+        # Check if there is gemma3n:e4b model, using the list already fetched instead of another request
+        model_names = {m.get("name") for m in models.get("models", [])}
+        if "gemma3n:e4b" not in model_names:
+            print("⚠️  Warning: gemma3n:e4b model not found")
+            print("   Please run: ollama pull gemma3n:e4b")
+        else:
+            print("✓ gemma3n:e4b Model is ready")
             
-            # Check if there is gemma3n:e4b model
-            if not await client.check_model_exists("gemma3n:e4b"):
-                print("⚠️  Warning: gemma3n:e4b model not found")
-                print("   Please run: ollama pull gemma3n:e4b")
-            else:
-                print("✓ gemma3n:e4b Model is ready")
-                
     except Exception as e:
         print(f"✗ Ollama connection failed: {e}")
         print("Please make sure that the Ollama service is started and running 'ollama serve'")
-        return False
+        return None
     
-    return True
+    return client
 
 def main():
     """Main function"""
     print("Launch novel animation interactive display system...")
     
-    # Check Ollama Connection
-    if not asyncio.run(check_ollama_connection()):
-        print("Please start the Ollama service before running this program")
-        return
-    
-    print("Start the web server...")
-    uvicorn.run(
-        "main:app",
+    # NAM_DEV=1 keeps the single-process auto-reload server; otherwise run one worker per core
+    # (NAM_WORKERS overrides the count). uvicorn's "auto" loop/http pick uvloop and httptools
+    # whenever they are installed.
+    is_dev = os.environ.get("NAM_DEV") == "1"
+    workers = worker_count(is_dev)
+    server_options = dict(
         host="0.0.0.0",
         port=8000,
-        reload=True,
+        reload=is_dev,
+        workers=workers,
+        loop="auto",
+        http="auto",
         log_level="info"
     )
+    
+    # One loop hosts both the Ollama check and, when serving in-process, the server itself,
+    # so the checked client's connection pool is still warm when requests arrive
+    with asyncio.Runner(loop_factory=new_event_loop) as runner:
+        stack = contextlib.AsyncExitStack()
+        try:
+            # Check Ollama Connection
+            client = runner.run(check_ollama_connection(stack))
+            if client is None:
+                print("Please start the Ollama service before running this program")
+                return
+            
+            print("Start the web server...")
+            if is_dev or workers > 1:
+                # Reloader and worker processes run their own loops; they cannot share this client
+                runner.run(stack.aclose())
+                uvicorn.run("run:create_app", factory=True, **server_options)
+            else:
+                # A single worker is served from this process, on the loop that ran the check
+                from main import app
+                app.state.ollama_client = client
+                runner.run(uvicorn.Server(uvicorn.Config(app, **server_options)).serve())
+        finally:
+            runner.run(stack.aclose())
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
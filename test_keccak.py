@@ -1,29 +1,38 @@
 import sys
+from functools import lru_cache
 
 
-def compute_transfer_topic():
-    # Try Web3.keccak first
+TRANSFER_SIGNATURE = "Transfer(address,address,uint256)"
+# keccak256 of TRANSFER_SIGNATURE; constant, so the common case needs no hashing library at all
+TRANSFER_TOPIC = "0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef"
+
+
+@lru_cache(maxsize=None)
+def _compute_topic(sig: str) -> str:
+    # Imported lazily and straight from a C Keccak, instead of pulling in web3/eth_utils
     try:
-        from web3 import Web3
-        print(Web3.keccak(text="Transfer(address,address,uint256)").hex())
-        return
-    except Exception:
+        from Crypto.Hash import keccak
+        h = keccak.new(digest_bits=256)
+        h.update(sig.encode())
+        return "0x" + h.hexdigest()
+    except ImportError:
         pass
 
-    # Try eth_utils.keccak
+    # pysha3
     try:
-        from eth_utils import keccak
-        try:
-            print(keccak(text="Transfer(address,address,uint256)").hex())
-            return
-        except TypeError:
-            print(keccak(b"Transfer(address,address,uint256)").hex())
-            return
-    except Exception:
+        import sha3
+        return "0x" + sha3.keccak_256(sig.encode()).hexdigest()
+    except ImportError:
         pass
 
-    # Final fallback constant
-    print("0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef")
+    raise RuntimeError(f"No keccak implementation available to hash {sig!r}")
+
+
+def compute_transfer_topic(sig: str = TRANSFER_SIGNATURE):
+    if sig == TRANSFER_SIGNATURE:
+        print(TRANSFER_TOPIC)
+        return
+    print(_compute_topic(sig))
 
 
 if __name__ == "__main__":